@@ -1,5 +1,14 @@
+import argparse
+import mmap
+import os
 import subprocess
 import re
+import shutil
+import signal
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 # ==== CONFIGURABLE PARAMETERS ====
 bits = 16
@@ -14,6 +23,11 @@ row_out = M    # destination row (write result)
 instances_file = "sram_8t_helper.cir"
 template_file = "sram_8t_template.cir"
 top_file = "sram_8t_run.cir"
+# Per-row_in2 copies of the files above are named "<stem>_{row_in2}.cir"
+# so that parallel ngspice jobs never clobber each other. They and the
+# ngspice logs live in a scratch directory under WORKDIR_PARENT (RAM-backed
+# /dev/shm when available), which is removed when the run ends.
+WORKDIR_PARENT = "/dev/shm" if os.path.isdir("/dev/shm") else None
 pattern_file = "data_in.txt"        # text file with M lines, each line N bits (0/1)
 data_out_file = "data_out.txt"      # output file for digital results
 
@@ -26,161 +40,305 @@ DIGITAL_THRESHOLD = 0.9
 # Time window for energy measurement (must match your .tran range)
 ENERGY_TSTART = "200p"
 ENERGY_TSTOP  = "1400p"                # <-- change to your tran stop time
+
+# Print every pattern line as it is read
+DEBUG = False
+
+# Put the gnuplot command into each run of the default process-pool mode
+# (also set by --plot). Off by default: in batch runs nobody looks at the
+# plots and gnuplot only costs time. --batch and --pipe never plot.
+EMIT_PLOT = False
 # =================================
 
+# Measure lines in the ngspice log, compiled once:
+#   v_q_r{row_out}_c{c} = <value>   -> groups (c, None, value)
+#   e_vdd = <value>                 -> groups (None, "e_vdd", value)
+# The log is scanned as raw bytes, so the pattern is a bytes pattern.
+_NUM = rb"([+-]?\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)"
+_PAT_MEAS = re.compile(rb"(?:v_q_r%d_c(\d+)|(e_vdd))\s*=\s*" % row_out + _NUM)
+# Same measures in a --batch log, suffixed with _it{row_in2}
+_PAT_BATCH = re.compile(rb"(?:v_q_r%d_c(\d+)|(e_vdd))_it(\d+)\s*=\s*" % row_out + _NUM)
+
+# Translation table for pattern lines: keeps '1' and maps any other
+# character to '0'. Inversion happens afterwards on the whole array.
+_CLEAN_BITS = bytes(ch if ch == ord("1") else ord("0") for ch in range(256))
+
 
 def read_pattern(filename, M, N):
     """
-    Read an MxN pattern of '0'/'1' from a text file.
+    Read an MxN pattern of '0'/'1' from a text file into an (M, N)
+    uint8 array of 0/1.
     - Each non-empty line = one row.
     - Extra spaces are ignored.
     - If a line has fewer than N bits, it's padded with '0'.
     - If it has more, it's truncated to N.
     - Bits are then inverted (as you had in your code).
     """
-    rows = []
-    with open(filename, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            # remove spaces if any
-            line = line.replace(" ", "")
-            bits = [ch if ch in ("0", "1") else "0" for ch in line]
-            # invert bits (keep your original behaviour)
-            bits = ["1" if b == "0" else "0" for b in bits]
-            print(f"Read line: {line} -> bits (inverted): {bits}")
-            if len(bits) < N:
-                bits += ["0"] * (N - len(bits))
-            elif len(bits) > N:
-                bits = bits[:N]
-            rows.append(bits)
-            if len(rows) >= M:
-                break
+    with open(filename, "rb") as f:
+        lines = f.read().splitlines()
+
+    # Rows before inversion. Short lines are padded with '1' so that
+    # they read as '0' once inverted, as before.
+    raw = []
+    source = []  # stripped input lines, for the DEBUG output
+    for line in lines:
+        # remove spaces if any
+        line = line.strip().replace(b" ", b"")
+        if not line:
+            continue
+        raw.append(line.translate(_CLEAN_BITS)[:N].ljust(N, b"1"))
+        source.append(line)
+        if len(raw) >= M:
+            break
+
+    print(f"Read {len(raw)} pattern rows from {filename}")
+
+    # If fewer than M useful lines, the remaining rows stay all-zero
+    pattern = np.zeros((M, N), dtype=np.uint8)
+    if raw:
+        bits = np.frombuffer(b"".join(raw), dtype=np.uint8).reshape(len(raw), N) - ord("0")
+        # invert bits (keep your original behaviour)
+        pattern[:len(raw)] = bits ^ 1
+        if DEBUG:
+            for line, row in zip(source, pattern):
+                print(f"Read line: {line.decode('ascii', 'replace')} -> bits (inverted): {''.join(map(str, row))}")
+    return pattern  # M x N uint8 array of 0/1
+
+# Netlist line templates used by generate_static_prelude.
+# These are %-style templates: positional % formatting is cheaper than
+# str.format for the M*N cell and .ic lines.
+PULSE = "pulse 0 1.8 init_time taper_time taper_time wl_dur wl_period"
+# % (r, c, c, c, r, c, r, c, r, r, c)
+CELL_TMPL = (
+    "Xcell_r%d_c%d wbl_%d wbl_bar_%d "
+    "q_r%d_c%d q_bar_r%d_c%d "
+    "wwl_%d rwl_%d rbl_%d "
+    "8t_sram "
+    "width_N={1.5*width_N} width_N_acc={width_N} width_P={width_N} "
+    "width_N_read_1={20*LAMBDA} width_N_read_2={20*LAMBDA}\n"
+)
+# % {"c": c, "row_out": row_out}
+COLUMN_TMPL = (
+    # Precharge read bitline
+    "Xpc_c%(c)d rbl_%(c)d pch pre_charge_single width_P={width_pc}\n"
+    # Bitline capacitance on rbl_c
+    "C_rbl_%(c)d rbl_%(c)d gnd 50fF\n"
+    # Write driver for this column
+    "Xwd_c%(c)d rbl_%(c)d wwl_%(row_out)d wbl_%(c)d wbl_bar_%(c)d "
+    "write_driver width_N={width_N} width_P={width_P}\n"
+)
+# % (r, c, b, r, c, b)
+IC_TMPL = (
+    ".ic V(q_r%d_c%d) = {%d*vdd}  "
+    "V(q_bar_r%d_c%d) = {vdd - %d*vdd}\n"
+)
+
+
+def generate_static_prelude(M, N, row_in1, row_out, pattern):
+    """
+    Build the part of the helper netlist that does not depend on row_in2:
+    cells, per-column circuits, precharge source, wordline drivers of the
+    rows outside the row_in2 sweep, and all initial conditions.
+    Wordline drivers of rows 2..M-1 come from generate_rowin2_block().
+    Returns the prelude as a single string.
+    """
+    parts = []
+    append = parts.append
+
+    append("* Auto-generated SRAM array instances\n")
+    append(f"* M={M}, N={N}, row_in1={row_in1}, row_out={row_out}\n\n")
+
+    # --------------------------------------------------
+    # 1) Instantiate all 8T cells
+    # Node naming:
+    #   q_r{r}_c{c}, q_bar_r{r}_c{c}
+    #   wwl_{r}, rwl_{r}
+    #   wbl_{c}, wbl_bar_{c}, rbl_{c}
+    # --------------------------------------------------
+    parts.extend([
+        CELL_TMPL % (r, c, c, c, r, c, r, c, r, r, c)
+        for r in range(1, M + 1) for c in range(1, N + 1)
+    ])
+    append("\n")
+
+    # --------------------------------------------------
+    # 2) Per-column circuits:
+    #    - precharge rbl_c with pre_charge_single (node=rbl_c, pc_en=pch)
+    #    - bitline capacitance C_rbl_c
+    #    - write_driver for each column
+    # --------------------------------------------------
+    for c in range(1, N + 1):
+        append(COLUMN_TMPL % {"c": c, "row_out": row_out})
+    append("\n")
+
+    # --------------------------------------------------
+    # 2b) Global precharge control for all columns
+    # --------------------------------------------------
+    append("V_pc pch gnd " + PULSE + "\n\n")
+
+    # --------------------------------------------------
+    # 3) Wordline drivers for the rows row_in2 never takes
+    # --------------------------------------------------
+    for r in range(1, M + 1):
+        if 2 <= r < M:
+            continue
+        append(wordline_drivers(r, row_in1, None, row_out))
+    append("\n")
+
+    # --------------------------------------------------
+    # 4) Initial conditions
+    # Use pattern[r-1, c-1] as bit (0/1).
+    # q = {bit * vdd}, q_bar = {vdd - bit * vdd}
+    # --------------------------------------------------
+    append("* Initial conditions for all cells and read bitlines\n")
+    for c in range(1, N + 1):
+        append(f".ic V(rbl_{c}) = 0\n")
+
+    for r, row in enumerate(pattern.tolist(), start=1):
+        for c, bit_val in enumerate(row, start=1):
+            append(IC_TMPL % (r, c, bit_val, r, c, bit_val))
+    append("\n")
+
+    return "".join(parts)
+
 
-    # If fewer than M useful lines, pad with all-zero rows
-    while len(rows) < M:
-        rows.append(["0"] * N)
+def wordline_drivers(r, row_in1, row_in2, row_out):
+    """Return the V_rwl_{r} / V_wwl_{r} source lines for row r."""
+    if r == row_in1 or r == row_in2:
+        # Read rows
+        return f"V_rwl_{r} rwl_{r} gnd {PULSE}\nV_wwl_{r} wwl_{r} gnd dc 0\n"
+    if r == row_out:
+        # Write row
+        return f"V_rwl_{r} rwl_{r} gnd dc 0\nV_wwl_{r} wwl_{r} gnd {PULSE}\n"
+    # Idle rows
+    return f"V_rwl_{r} rwl_{r} gnd dc 0\nV_wwl_{r} wwl_{r} gnd dc 0\n"
 
-    return rows  # list of M rows, each row is list of N chars '0'/'1'
 
-def generate_instances(M, N, row_in1, row_in2, row_out, out_file, pattern, sample_time):
+def generate_rowin2_block(row_in2, M, row_in1, row_out):
     """
-    Generate the helper netlist (instances + sources + ICs) and
-    return a string with analysis commands (plot + measures)
-    to inject into the .control block.
+    Build the part of the helper netlist that changes with row_in2:
+    the wordline drivers of rows 2..M-1, with row_in2 read-enabled.
     """
-    with open(out_file, "w") as f:
-        f.write("* Auto-generated SRAM array instances\n")
-        f.write(
-            f"* M={M}, N={N}, row_in1={row_in1}, row_in2={row_in2}, "
-            f"row_out={row_out}\n\n"
-        )
+    parts = [f"* Wordline drivers for row_in2={row_in2}\n"]
+    for r in range(2, M):
+        parts.append(wordline_drivers(r, row_in1, row_in2, row_out))
+    return "".join(parts)
+
 
-        # --------------------------------------------------
-        # 1) Instantiate all 8T cells
-        # Node naming:
-        #   q_r{r}_c{c}, q_bar_r{r}_c{c}
-        #   wwl_{r}, rwl_{r}
-        #   wbl_{c}, wbl_bar_{c}, rbl_{c}
-        # --------------------------------------------------
-        for r in range(1, M + 1):
-            for c in range(1, N + 1):
-                f.write(
-                    "Xcell_r{r}_c{c} wbl_{c} wbl_bar_{c} "
-                    "q_r{r}_c{c} q_bar_r{r}_c{c} "
-                    "wwl_{r} rwl_{r} rbl_{c} "
-                    "8t_sram "
-                    "width_N={{1.5*width_N}} width_N_acc={{width_N}} width_P={{width_N}} "
-                    "width_N_read_1={{20*LAMBDA}} width_N_read_2={{20*LAMBDA}}\n"
-                    .format(r=r, c=c)
-                )
-        f.write("\n")
-
-        # --------------------------------------------------
-        # 2) Per-column circuits:
-        #    - precharge rbl_c with pre_charge_single (node=rbl_c, pc_en=pch)
-        #    - bitline capacitance C_rbl_c
-        #    - write_driver for each column
-        # --------------------------------------------------
+def generate_instances(out_file, prelude, row_in2, M, row_in1, row_out):
+    """
+    Write the helper netlist for one RCS iteration:
+    the cached static prelude followed by the row_in2 block.
+    """
+    # One write for the whole netlist instead of one per line
+    with open(out_file, "w", buffering=1 << 20) as f:
+        f.write(prelude + generate_rowin2_block(row_in2, M, row_in1, row_out))
+
+
+def generate_batch_block(M, row_in1, row_out, first_row_in2):
+    """
+    Build the wordline drivers of rows 2..M-1 for a --batch run.
+    The read wordline of each swept row is a VCVS copy of one shared
+    pulse; generate_batch_control() selects row_in2 by setting its gain
+    to 1. If row_out is among them, its write wordline is a VCVS copy
+    too, switched off while it is row_in2 (the read role wins, as in
+    wordline_drivers()). The netlist starts with row_in2 = first_row_in2
+    selected.
+    Returns: (block, swept_rows) where swept_rows are the rows with a VCVS.
+    """
+    parts = ["* Wordline drivers for the batched row_in2 sweep\n",
+             f"V_rwl_pulse rwl_pulse gnd {PULSE}\n"]
+    swept_rows = []
+    for r in range(2, M):
+        if r == row_in1:
+            parts.append(wordline_drivers(r, row_in1, None, row_out))
+            continue
+        selected = r == first_row_in2
+        parts.append(f"E_rwl_{r} rwl_{r} gnd rwl_pulse gnd {int(selected)}\n")
+        if r == row_out:
+            parts.append(f"E_wwl_{r} wwl_{r} gnd rwl_pulse gnd {int(not selected)}\n")
+        else:
+            parts.append(f"V_wwl_{r} wwl_{r} gnd dc 0\n")
+        swept_rows.append(r)
+    return "".join(parts), swept_rows
+
+
+def generate_batch_control(rows, N, row_out, sample_time, swept_rows):
+    """
+    Return the .control commands that sweep row_in2 over rows inside
+    one ngspice process. They go where @PLOT_CMD@ is, i.e. after the
+    template's own run, which simulates row_in2 = rows[0].
+    Every measure name carries an _it{row_in2} suffix.
+    """
+    def select(r, on):
+        """alter commands that make swept row r row_in2 (on) or not."""
+        if r not in swept_rows:
+            return []
+        cmds = [f"alter @e_rwl_{r}[gain] = {int(on)}"]
+        if r == row_out:
+            cmds.append(f"alter @e_wwl_{r}[gain] = {int(not on)}")
+        return cmds
+
+    first = rows[0]
+    prev = None
+    cmds = []
+    for row_in2 in rows:
+        if row_in2 != first:
+            # reset rebuilds the circuit from the deck and brings back the
+            # .ic values. Deselect both the deck's row and the previous
+            # iteration's row explicitly, so no earlier alter can survive.
+            cmds.append("reset")
+            cmds.extend(select(first, False))
+            if prev != first:
+                cmds.extend(select(prev, False))
+            cmds.extend(select(row_in2, True))
+            cmds.append("run")
+        prev = row_in2
         for c in range(1, N + 1):
-            # Precharge read bitline
-            f.write(
-                "Xpc_c{c} rbl_{c} pch pre_charge_single width_P={{width_pc}}\n"
-                .format(c=c)
+            cmds.append(
+                f"meas tran v_q_r{row_out}_c{c}_it{row_in2} "
+                f"FIND v(q_r{row_out}_c{c}) AT={sample_time}"
             )
+        cmds.append("let p_vdd = -vdd#branch * v(vdd)")
+        cmds.append(
+            f"meas tran e_vdd_it{row_in2} INTEG p_vdd "
+            f"FROM={ENERGY_TSTART} TO={ENERGY_TSTOP}"
+        )
+        # reset does not free plots; drop this iteration's transient data
+        cmds.append("destroy all")
+    return "\n".join(cmds)
 
-            # Bitline capacitance on rbl_c
-            f.write("C_rbl_{c} rbl_{c} gnd 50fF\n".format(c=c))
 
-            # Write driver for this column
-            f.write(
-                "Xwd_c{c} rbl_{c} wwl_{row_out} wbl_{c} wbl_bar_{c} "
-                "write_driver width_N={{width_N}} width_P={{width_P}}\n"
-                .format(c=c, row_out=row_out)
-            )
+def parse_batch_measures(logfile, N):
+    """
+    Parse the log of a --batch run (measures of the configured row_out,
+    see _PAT_BATCH).
+    Returns: {row_in2: (list_of_v, energy)}
+    """
+    values = {}
+    energy = {}
 
-        f.write("\n")
+    with open(logfile, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for m in _PAT_BATCH.finditer(mm):
+                    it = int(m.group(3))
+                    if m.group(2):
+                        energy[it] = float(m.group(4))
+                    else:
+                        values.setdefault(it, {})[int(m.group(1))] = float(m.group(4))
 
-        # --------------------------------------------------
-        # 2b) Global precharge control for all columns
-        # --------------------------------------------------
-        f.write(
-            "V_pc pch gnd "
-            "pulse 0 1.8 init_time taper_time taper_time wl_dur wl_period\n\n"
-        )
+    return {
+        it: ([values.get(it, {}).get(c, 0.0) for c in range(1, N + 1)], energy.get(it, 0.0))
+        for it in sorted(set(values) | set(energy))
+    }
 
-        # --------------------------------------------------
-        # 3) Wordline drivers for all rows
-        # --------------------------------------------------
-        for r in range(1, M + 1):
-            if r == row_in1 or r == row_in2:
-                # Read rows
-                f.write(
-                    "V_rwl_{r} rwl_{r} gnd "
-                    "pulse 0 1.8 init_time taper_time taper_time wl_dur wl_period\n"
-                    .format(r=r)
-                )
-                f.write("V_wwl_{r} wwl_{r} gnd dc 0\n".format(r=r))
-            elif r == row_out:
-                # Write row
-                f.write("V_rwl_{r} rwl_{r} gnd dc 0\n".format(r=r))
-                f.write(
-                    "V_wwl_{r} wwl_{r} gnd "
-                    "pulse 0 1.8 init_time taper_time taper_time wl_dur wl_period\n"
-                    .format(r=r)
-                )
-            else:
-                # Idle rows
-                f.write("V_rwl_{r} rwl_{r} gnd dc 0\n".format(r=r))
-                f.write("V_wwl_{r} wwl_{r} gnd dc 0\n".format(r=r))
-
-        f.write("\n")
-
-        # --------------------------------------------------
-        # 4) Initial conditions
-        # Use pattern[r-1][c-1] as bit (0/1).
-        # q = {bit * vdd}, q_bar = {vdd - bit * vdd}
-        # --------------------------------------------------
-        f.write("* Initial conditions for all cells and read bitlines\n")
-        for c in range(1, N + 1):
-            f.write(".ic V(rbl_{c}) = 0\n".format(c=c))
-
-        for r in range(1, M + 1):
-            for c in range(1, N + 1):
-                bit_char = pattern[r - 1][c - 1]
-                bit_val = 1 if bit_char == "1" else 0
-                line = (
-                    ".ic V(q_r{r}_c{c}) = {{{b}*vdd}}  "
-                    "V(q_bar_r{r}_c{c}) = {{vdd - {b}*vdd}}\n"
-                    .format(r=r, c=c, b=bit_val)
-                )
-                f.write(line)
-                print(line.strip())
-
-    # ------------------------------------------------------
-    # 5) Build analysis commands (plot + measures) to inject
-    # ------------------------------------------------------
+
+def generate_analysis_cmds(N, row_out, sample_time):
+    """
+    Return the analysis commands (plot + measures) to inject
+    into the .control block. They are the same for every row_in2.
+    """
     # Plot: wwl_row_out and first up-to-4 columns of q_r{row_out}_c*
     cols_to_plot = N
     offset = 2
@@ -206,116 +364,426 @@ def generate_instances(M, N, row_in1, row_in2, row_out, out_file, pattern, sampl
 
     return plot_cmd, measure_cmds
 
-def inject_plot(template_file, output_file, plot_cmd, measure_cmds):
-    """
-    Replace the @PLOT_CMD@ and @MEAS_CMD@ placeholders with
-    the actual plot and measure commands.
-    """
-    with open(template_file, "r") as fin, open(output_file, "w") as fout:
-        for line in fin:
-            if "@PLOT_CMD@" in line:
-                fout.write(plot_cmd + "\n")
-            elif "@MEAS_CMD@" in line:
-                for cmd in measure_cmds:
-                    fout.write(cmd + "\n")
-            else:
-                fout.write(line)
+# Lines of the template that are filled in by the script
+HELPER_INCLUDE = f'.include "{instances_file}"'
+PLOT_MARKER = "@PLOT_CMD@"
+MEAS_MARKER = "@MEAS_CMD@"
 
 
-def parse_measures(logfile, row_out, N):
+def load_template(template_file):
+    """
+    Read the template once and cut it into the fixed text around the
+    lines that the script fills in: the helper .include and the
+    @PLOT_CMD@ / @MEAS_CMD@ placeholders.
+    Returns: (segments, slots) where slots[i] is the marker of the line
+    that goes between segments[i] and segments[i + 1].
+    """
+    with open(template_file, "r") as fin:
+        tmpl = fin.read()
+
+    # ngspice runs in the scratch directory, so other relative .include
+    # paths (the device models) are made absolute against the template
+    template_dir = os.path.dirname(os.path.abspath(template_file))
+
+    def absolute_include(m):
+        if m.group(0) == HELPER_INCLUDE or os.path.isabs(m.group(1)):
+            return m.group(0)
+        return f'.include "{os.path.join(template_dir, m.group(1))}"'
+
+    tmpl = re.sub(r'(?m)^\.include "([^"]+)"', absolute_include, tmpl)
+
+    cuts = []
+    for marker in (HELPER_INCLUDE, PLOT_MARKER, MEAS_MARKER):
+        pos = tmpl.find(marker)
+        if pos < 0:
+            if marker == HELPER_INCLUDE:
+                raise ValueError(f"{template_file} has no line {HELPER_INCLUDE}")
+            continue
+        # The whole line holding the marker is replaced
+        start = tmpl.rfind("\n", 0, pos) + 1
+        end = tmpl.find("\n", pos)
+        end = len(tmpl) if end < 0 else end + 1
+        cuts.append((start, end, marker))
+    cuts.sort()
+
+    segments, slots, prev = [], [], 0
+    for start, end, marker in cuts:
+        segments.append(tmpl[prev:start])
+        slots.append(marker)
+        prev = end
+    segments.append(tmpl[prev:])
+    return segments, slots
+
+
+def inject_plot(template, plot_cmd, measure_cmds):
+    """
+    Replace the @PLOT_CMD@ and @MEAS_CMD@ placeholders of a template
+    from load_template() with the actual plot and measure commands.
+    Returns: (pre, post), the text before and after the helper .include,
+    which is the only line write_top() changes per iteration.
+    """
+    segments, slots = template
+    fill = {
+        PLOT_MARKER: plot_cmd + "\n",
+        MEAS_MARKER: "".join(cmd + "\n" for cmd in measure_cmds),
+    }
+    pieces = [segments[0]]
+    for marker, segment in zip(slots, segments[1:]):
+        pieces.append(fill.get(marker, ""))
+        pieces.append(segment)
+    # pieces[2 * k + 1] is the line for slots[k]
+    k = 2 * slots.index(HELPER_INCLUDE) + 1
+    return "".join(pieces[:k]), "".join(pieces[k + 1:])
+
+
+def write_top(output_file, top, instances_file):
+    """Write the output of inject_plot(), pointing its .include at instances_file."""
+    pre, post = top
+    with open(output_file, "w") as fout:
+        fout.write(pre + f'.include "{instances_file}"\n' + post)
+
+
+# ngspice prints .measure results at the end of the log, so only the
+# last LOG_TAIL_BYTES are scanned unless something is missing there.
+LOG_TAIL_BYTES = 64 * 1024
+
+
+def _scan_measures(text, values):
+    """Collect v_q_r{row_out}_c* into values and return E_VDD (or None)."""
+    energy = None
+    for m in _PAT_MEAS.finditer(text):
+        if m.group(2):
+            energy = float(m.group(3))
+        else:
+            values[int(m.group(1))] = float(m.group(3))
+    return energy
+
+
+def parse_measures(logfile, N):
     """
     Parse ngspice log file to extract:
       - measured values v_q_r{row_out}_c1..cN
       - energy E_VDD
+    where row_out is the configured row_out that _PAT_MEAS is built for.
     Returns: (list_of_v, energy)
     """
     values = {}
-    energy = 0.0
+    energy = None
 
-    pattern_v = re.compile(
-        r"v_q_r{row}_c(\d+)\s*=\s*([+-]?\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)"
-        .format(row=row_out)
-    )
-    pattern_e = re.compile(
-        r"e_vdd\s*=\s*([+-]?\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)"
-    )
+    with open(logfile, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                energy = _scan_measures(mm[max(0, size - LOG_TAIL_BYTES):], values)
 
-    with open(logfile, "r") as f:
-        for line in f:
-            mv = pattern_v.search(line)
-            if mv:
-                col = int(mv.group(1))
-                val = float(mv.group(2))
-                values[col] = val
-
-            me = pattern_e.search(line)
-            if me:
-                energy = float(me.group(1))
+                # Fall back to the whole log if the tail did not hold every measure
+                if size > LOG_TAIL_BYTES and (energy is None or len(values) < N):
+                    values.clear()
+                    energy = _scan_measures(mm, values)
 
     analog_vals = [values.get(c, 0.0) for c in range(1, N + 1)]
-    return analog_vals, energy
+    return analog_vals, energy if energy is not None else 0.0
 
 
 def analog_to_bits(values, threshold):
     """Convert list of analog voltages to list of '0'/'1' using threshold."""
-    bits = []
-    for v in values:
-        b = "1" if v >= threshold else "0"
-        bits.append(b)
-    return bits
+    mask = np.asarray(values, dtype=np.float64) >= threshold
+    return np.where(mask, "1", "0").tolist()
 
 
-def main():
-    # 0) Read initial pattern from file
-    pattern = read_pattern(pattern_file, M, N)
-    analog_vals_all = []
-    digital_vals_all = []
-    energy_all = []
+def iteration_files(row_in2, workdir):
+    """Return the (helper, top, log) file paths in workdir used for one row_in2."""
+    return (
+        os.path.join(workdir, f"{os.path.splitext(instances_file)[0]}_{row_in2}.cir"),
+        os.path.join(workdir, f"{os.path.splitext(top_file)[0]}_{row_in2}.cir"),
+        os.path.join(workdir, f"ngspice_row_in2_{row_in2}.log"),
+    )
+
+
+# Set in a pool worker once Ctrl+C has been pressed
+_interrupted = False
 
-    # 1) Open data_out.txt and write N in the first line
-    with open(data_out_file, "w") as fout:
-        fout.write(str(N) + "\n")
 
-        # 2) Iterate RCS with row_in2 from 2 to 5 (inclusive)
-        for row_in2 in range(2, M):
+def _on_sigint(signum, frame):
+    global _interrupted
+    _interrupted = True
+
+
+def _init_worker():
+    """
+    Pool worker initializer. Ctrl+C reaches every process in the group:
+    a running ngspice dies from it, and the worker only records it so that
+    jobs already handed to it return without starting ngspice. The main
+    process cancels the rest.
+    """
+    signal.signal(signal.SIGINT, _on_sigint)
+
+
+def run_one(row_in2, prelude, top, workdir):
+    """
+    Run a single RCS iteration for the given row_in2.
+    prelude is the output of generate_static_prelude() and
+    top is the output of inject_plot().
+    Every file written here carries row_in2 in its name, so several
+    iterations can run side by side.
+    Returns: (row_in2, analog_vals, bits, energy), or None if ngspice failed
+    or the run was interrupted.
+    """
+    if _interrupted:
+        return None
+
+    helper, top_file_k, log_file = iteration_files(row_in2, workdir)
+
+    print(f"\n=== RCS iteration with row_in2 = {row_in2} ===")
+
+    # a) Generate helper netlist from the cached prelude
+    generate_instances(helper, prelude, row_in2, M, row_in1, row_out)
+
+    # b) Write top-level run file from the rendered template
+    write_top(top_file_k, top, helper)
+
+    # c) Run ngspice in batch mode, log to a file
+    try:
+        subprocess.run(
+            ["ngspice", "-b", "-o", log_file, top_file_k], cwd=workdir, check=True
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"ngspice exited with error code {e.returncode} for row_in2={row_in2}.")
+        return None
+
+    # d) Parse measured analog values and energy, then convert to bits
+    analog_vals, energy = parse_measures(log_file, N)
+    bits = analog_to_bits(analog_vals, DIGITAL_THRESHOLD)
+    return row_in2, analog_vals, bits, energy
+
+
+def run_batch(rows, prelude, template, workdir):
+    """
+    Run the RCS sweep over rows in a single ngspice process, so device
+    models are loaded once instead of once per row_in2.
+    Returns: list of (row_in2, analog_vals, bits, energy), empty if ngspice failed.
+    """
+    helper, top, log_file = iteration_files("batch", workdir)
+
+    print(f"\n=== Batched RCS sweep, row_in2 in {rows} ===")
+
+    block, swept_rows = generate_batch_block(M, row_in1, row_out, rows[0])
+    with open(helper, "w", buffering=1 << 20) as f:
+        f.write(prelude + block)
+
+    # The sweep replaces the plot; the deck-level measures are dropped
+    # because the sweep measures each iteration under its own name
+    control = generate_batch_control(rows, N, row_out, SAMPLE_TIME, swept_rows)
+    write_top(top, inject_plot(template, control, []), helper)
+
+    try:
+        subprocess.run(["ngspice", "-b", "-o", log_file, top], cwd=workdir, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"ngspice exited with error code {e.returncode} for the batched sweep.")
+        return []
+
+    results = []
+    for row_in2, (analog_vals, energy) in parse_batch_measures(log_file, N).items():
+        bits = analog_to_bits(analog_vals, DIGITAL_THRESHOLD)
+        results.append((row_in2, analog_vals, bits, energy))
+    return results
+
+
+def run_pipe(rows, prelude, top, workdir):
+    """
+    Run the RCS sweep over rows serially through one interactive ngspice process
+    fed over a pipe. Each iteration is sourced into the running process,
+    so ngspice starts once, and the measures are read straight from its
+    stdout instead of from a log file.
+    Returns: list of (row_in2, analog_vals, bits, energy).
+    """
+    proc = subprocess.Popen(
+        ["ngspice", "-p"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        cwd=workdir
+    )
+    results = []
+    try:
+        proc.stdin.write(b"set noaskquit\n")
+        for row_in2 in rows:
+            helper, top_file_k, _ = iteration_files(row_in2, workdir)
+
             print(f"\n=== RCS iteration with row_in2 = {row_in2} ===")
 
-            # 2a) Generate helper netlist + analysis block
-            plot_cmd, meas_cmd = generate_instances(
-                M, N, row_in1, row_in2, row_out,
-                instances_file, pattern, SAMPLE_TIME
+            generate_instances(helper, prelude, row_in2, M, row_in1, row_out)
+            write_top(top_file_k, top, helper)
+
+            # Sourcing a deck with a .control block runs it. Free the circuit
+            # and its plots afterwards, then echo a sentinel so we know where
+            # this iteration's output ends.
+            sentinel = f"===END{row_in2}==="
+            proc.stdin.write(
+                f"source {top_file_k}\nremcirc\ndestroy all\necho {sentinel}\n".encode()
             )
+            proc.stdin.flush()
+
+            output = []
+            for line in iter(proc.stdout.readline, b""):
+                if line.rstrip().endswith(sentinel.encode()):
+                    break
+                output.append(line)
+            else:
+                print(f"ngspice exited unexpectedly during row_in2={row_in2}.")
+                break
 
-            # 2b) Inject analysis commands into top-level run file
-            inject_plot(template_file, top_file, plot_cmd, meas_cmd)
-
-            # 2c) Run ngspice in batch mode, log to a file
-            log_file = f"ngspice_row_in2_{row_in2}.log"
-            try:
-                subprocess.run(
-                    ["ngspice", "-b", "-o", log_file, top_file],
-                    check=True
-                )
-            except KeyboardInterrupt:
-                print("\nSimulation interrupted by user (Ctrl+C). Exiting cleanly.")
-                return
-            except FileNotFoundError:
-                print("Error: ngspice not found. Make sure it is installed and in your PATH.")
-                return
-            except subprocess.CalledProcessError as e:
-                print(f"ngspice exited with error code {e.returncode} for row_in2={row_in2}.")
+            values = {}
+            energy = _scan_measures(b"".join(output), values)
+            if not values and energy is None:
+                print(f"ngspice reported no measures for row_in2={row_in2}.")
                 continue
 
-            # 2d) Parse measured analog values and energy, then convert to bits
-            analog_vals, energy = parse_measures(log_file, row_out, N)
+            analog_vals = [values.get(c, 0.0) for c in range(1, N + 1)]
             bits = analog_to_bits(analog_vals, DIGITAL_THRESHOLD)
+            results.append((row_in2, analog_vals, bits, energy or 0.0))
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return results
+
+
+def dedupe_rows(pattern, M, row_in1, row_out):
+    """
+    Map every row_in2 in 2..M-1 to the first row_in2 with the same pair of
+    input rows (pattern[row_in1-1], pattern[row_in2-1]). All rows share
+    the same bitlines, so as long as row_in2 is an ordinary row, two such
+    iterations simulate the same circuit up to a relabelling of rows and
+    only the first needs ngspice. row_in2 equal to row_in1 or row_out
+    changes which rows are read or written, so it is never aliased.
+    Returns: {row_in2: row_in2 whose result it reuses}
+    """
+    seen = {}
+    alias = {}
+    for row_in2 in range(2, M):
+        if row_in2 in (row_in1, row_out):
+            key = ("own", row_in2)
+        else:
+            key = pattern[row_in1 - 1].tobytes() + pattern[row_in2 - 1].tobytes()
+        alias[row_in2] = seen.setdefault(key, row_in2)
+    return alias
 
-            analog_vals_all.append(analog_vals)
-            digital_vals_all.append(bits)
-            energy_all.append(energy)
 
-            # 2e) Write bits as one row into data_out.txt
-            fout.write("".join(bits) + "\n")
+def main():
+    parser = argparse.ArgumentParser(description="Run the 8T SRAM RCS sweep in ngspice.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--jobs", type=int, default=os.cpu_count() or 1,
+        help="number of ngspice instances to run in parallel (default: CPU count)"
+    )
+    mode.add_argument(
+        "--batch", action="store_true",
+        help="run the whole row_in2 sweep in a single ngspice process"
+    )
+    mode.add_argument(
+        "--pipe", action="store_true",
+        help="run the row_in2 sweep serially through one interactive ngspice process"
+    )
+    parser.add_argument(
+        "--plot", action="store_true",
+        help="emit the gnuplot command in each run "
+             "(default process-pool mode only; not allowed with --batch or --pipe)"
+    )
+    parser.add_argument(
+        "--keep-workdir", action="store_true",
+        help="keep the scratch directory with the generated netlists and ngspice logs"
+    )
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.plot and (args.batch or args.pipe):
+        parser.error("--plot only applies to the default process-pool mode, "
+                     "not to --batch or --pipe")
+
+    # 0) Read initial pattern from file
+    pattern = read_pattern(pattern_file, M, N)
+
+    # Everything except the row_in2 wordline drivers is the same for every
+    # iteration, so render it once up front
+    prelude = generate_static_prelude(M, N, row_in1, row_out, pattern)
+    template = load_template(template_file)
+
+    # Iterations whose input rows repeat an earlier pair reuse its result
+    alias = dedupe_rows(pattern, M, row_in1, row_out)
+    rows = sorted(set(alias.values()))
+    if len(rows) < len(alias):
+        print(f"{len(alias) - len(rows)} of {len(alias)} RCS iterations repeat "
+              "an earlier input pair and will not be simulated")
+
+    row_in2_all = []
+    analog_vals_all = []
+    digital_vals_all = []
+    energy_all = []
+
+    # 1) Iterate RCS with row_in2 from 2 to M-1 (inclusive), either in one
+    #    ngspice process (batched or piped) or as one parallel job per row_in2
+    workdir = tempfile.mkdtemp(prefix="sramsim_", dir=WORKDIR_PARENT)
+    try:
+        if args.batch:
+            results = run_batch(rows, prelude, template, workdir)
+        elif args.pipe:
+            # No plot: there is nobody to look at it in a piped session
+            _, meas_cmd = generate_analysis_cmds(N, row_out, SAMPLE_TIME)
+            top = inject_plot(template, "", meas_cmd)
+            results = run_pipe(rows, prelude, top, workdir)
+        else:
+            plot_cmd, meas_cmd = generate_analysis_cmds(N, row_out, SAMPLE_TIME)
+            top = inject_plot(template, plot_cmd if args.plot or EMIT_PLOT else "", meas_cmd)
+            with ProcessPoolExecutor(
+                max_workers=args.jobs, initializer=_init_worker
+            ) as pool:
+                futures = [
+                    pool.submit(run_one, row_in2, prelude, top, workdir)
+                    for row_in2 in rows
+                ]
+                try:
+                    results = [fut.result() for fut in futures]
+                except BaseException:
+                    # Leaving the with-block would run every queued job, so
+                    # drop the ones that have not started (e.g. on Ctrl+C)
+                    # and wait only for those already running
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise
+    except KeyboardInterrupt:
+        print("\nSimulation interrupted by user (Ctrl+C). Exiting cleanly.")
+        return
+    except FileNotFoundError:
+        print("Error: ngspice not found. Make sure it is installed and in your PATH.")
+        return
+    finally:
+        if args.keep_workdir:
+            print("Generated netlists and ngspice logs kept in", workdir)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    # Expand to every row_in2, copying results of the repeated iterations
+    simulated = {res[0]: res[1:] for res in results if res is not None}
+    results = [
+        (row_in2,) + simulated[alias[row_in2]]
+        for row_in2 in sorted(alias) if alias[row_in2] in simulated
+    ]
+
+    for row_in2, analog_vals, bits, energy in results:
+        row_in2_all.append(row_in2)
+        analog_vals_all.append(analog_vals)
+        digital_vals_all.append(bits)
+        energy_all.append(energy)
+
+    # 2) Write N in the first line of data_out.txt, then one row of bits per
+    #    row_in2, all in a single write
+    with open(data_out_file, "w") as fout:
+        fout.write(
+            f"{N}\n" + "".join("".join(bits) + "\n" for bits in digital_vals_all)
+        )
 
     print("\nSimulation completed. Results written to", data_out_file)
 
@@ -323,9 +791,8 @@ def main():
     print("\n===== RCS RESULT SUMMARY =====")
     print(f"{'row_in2':>7} | {'Analog values (V)':<40} | {'Bits':<6} | {'Energy [pJ]':>12}")
     print("-" * 80)
-    for idx, (analog_row, digital_row, energy) in enumerate(
-        zip(analog_vals_all, digital_vals_all, energy_all),
-        start=2
+    for idx, analog_row, digital_row, energy in zip(
+        row_in2_all, analog_vals_all, digital_vals_all, energy_all
     ):
         # energy is in Joules from ngspice (INTEG V*I dt)
         energy_pJ = energy * 1e12